@@ -1,39 +1,73 @@
-import json
 import argparse
-from typing import Optional, List, Union
+from collections import defaultdict
+from typing import Dict, Optional, List, Union
 from pathlib import Path
 
 import check_functions
-from report import generate_series_report
-from utils import load_template
+from utils import load_template, json_loads, write_json
 
 
-def find_matched_series(series_json: dict, name: Union[str, List[str]]) -> List[dict]:
-    matches = []
+def index_matched_series(series_json: dict) -> Dict[str, List[int]]:
+    """Index the positions of the series in the series JSON by their match name.
+
+    Args:
+        series_json (dict): The series JSON object.
+
+    Returns:
+        Dict[str, List[int]]: The positions of the matched series for each match name.
+    """
+    index = defaultdict(list)
+
+    for position, series in enumerate(series_json["series"]):
+        if "match" in series:
+            index[series["match"]].append(position)
+
+    return index
+
+
+def find_matched_series(
+    series_json: dict,
+    name: Union[str, List[str]],
+    index: Optional[Dict[str, List[int]]] = None,
+) -> List[dict]:
+    """Find the series matched to one or more names.
+
+    Args:
+        series_json (dict): The series JSON object.
+        name (str|list): The match name(s) to find.
+        index (dict): Index from index_matched_series. Computed if not provided.
+
+    Returns:
+        List[dict]: The matched series, in the order they appear in the series JSON.
+    """
+    if index is None:
+        index = index_matched_series(series_json)
 
     if isinstance(name, str):
         name = [name]
 
-    for series in series_json["series"]:
-        if "match" in series and series["match"] in name:
-            matches.append(series)
+    positions = sorted(position for n in set(name) for position in index.get(n, []))
 
-    return matches
+    return [series_json["series"][position] for position in positions]
 
 
-def perform_checks(directory: Path, template: str, report_format: Optional[str] = None):
+def perform_checks(
+    directory: Path, template: Union[str, dict], report_format: Optional[str] = None
+):
     # Load templated
     template = load_template(template)
 
     # Load series
-    with open(directory.joinpath("series.json"), "r", encoding="utf-8") as f:
-        series_json = json.load(f)
+    series_json_bytes = directory.joinpath("series.json").read_bytes()
+    series_json = json_loads(series_json_bytes)
 
     checks = template["checks"]
 
+    matched_index = index_matched_series(series_json)
+
     check_results = []
     for check in checks:
-        matched_series = find_matched_series(series_json, check["series"])
+        matched_series = find_matched_series(series_json, check["series"], matched_index)
         func = getattr(check_functions, check["function"])
         kwargs = check.get("args", {})
         result, output = func(matched_series, **kwargs)
@@ -53,10 +87,11 @@ def perform_checks(directory: Path, template: str, report_format: Optional[str]
 
     series_json["checks"] = check_results
 
-    with open(directory.joinpath("series.json"), "w", encoding="utf-8") as f:
-        json.dump(series_json, f, indent=2)
+    write_json(directory.joinpath("series.json"), series_json, current=series_json_bytes)
 
     if report_format:
+        from report import generate_series_report  # pylint: disable=import-outside-toplevel
+
         generate_series_report(
             series_json, directory, report_format=report_format, meta=template["meta"]
         )
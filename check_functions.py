@@ -78,23 +78,26 @@ def check_structures_present(
     result = True
     output = ""
 
+    # Case-fold the allowed variants once up front rather than per series
+    if case_sensitive:
+        variants_by_structure = {
+            structure: frozenset([structure, *variants])
+            for structure, variants in structures.items()
+        }
+    else:
+        variants_by_structure = {
+            structure: frozenset(v.lower() for v in [structure, *variants])
+            for structure, variants in structures.items()
+        }
+
     for s in series:
-        structures_present = s["structure_names"]
+        if case_sensitive:
+            structures_present = set(s["structure_names"])
+        else:
+            structures_present = {name.lower() for name in s["structure_names"]}
 
         for structure in structures:
-            allowed_variants = list(set([structure] + structures[structure]))
-            found = False
-            for variant in allowed_variants:
-                if case_sensitive:
-                    if variant in structures_present:
-                        found = True
-                        break
-                else:
-                    if variant.lower() in [s.lower() for s in structures_present]:
-                        found = True
-                        break
-
-            if not found:
+            if variants_by_structure[structure].isdisjoint(structures_present):
                 result = False
                 output += f"{structure} not found in series {s['series_uid']}\n"
 
@@ -144,16 +147,11 @@ def check_all_in_same(series: List[dict], key: str) -> Tuple[bool, str]:
     result = True
     output = ""
 
-    frame_of_references = []
-
-    for s in series:
-        frame_of_references.append(s[key])
-
-    unique_for = list(set(frame_of_references))
+    unique_values = {s[key] for s in series}
 
-    if len(unique_for) > 1:
+    if len(unique_values) > 1:
         result = False
-        output = f"{len(unique_for)} {key}s found"
+        output = f"{len(unique_values)} {key}s found"
 
     return result, output
 
@@ -175,28 +173,31 @@ def check_linked(series: List[dict], from_name: str, to_name: str) -> Tuple[bool
     result = True
     output = ""
 
+    # Index the 'to_name' series once by the series they reference and by frame of reference
+    referenced_series = set()
+    frame_of_references = set()
+    for s in series:
+        if s["match"] != to_name:
+            continue
+
+        referenced = s.get("referenced_series")
+        if isinstance(referenced, list):
+            referenced_series.update(referenced)
+        else:
+            referenced_series.add(referenced)
+
+        frame_of_references.add(s["frame_of_reference"])
+
     for s in series:
         if s["match"] == from_name:
-            linked = False
-            for s2 in series:
-                if s2["match"] == to_name and s["series_uid"] == s2.get(
-                    "referenced_series", []
-                ):
-                    linked = True
-                    break
+            # Link via referenced series, or try to link via frame_of_reference
+            linked = (
+                s["series_uid"] in referenced_series
+                or s["frame_of_reference"] in frame_of_references
+            )
 
             if not linked:
-                # Try to link via frame_of_reference
-                for s2 in series:
-                    if (
-                        s2["match"] == to_name
-                        and s["frame_of_reference"] == s2["frame_of_reference"]
-                    ):
-                        linked = True
-                        break
-
-                if not linked:
-                    result = False
-                    output += f"Series {s['series_uid']} not linked to {to_name}\n"
+                result = False
+                output += f"Series {s['series_uid']} not linked to {to_name}\n"
 
     return result, output
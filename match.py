@@ -1,29 +1,31 @@
-import json
+from collections import defaultdict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
-import networkx as nx
-import pandas as pd
+from utils import load_template, json_loads, write_json
 
-from report import generate_series_report
-from utils import load_template
-
-def match_series_to_template(directory: Path, template: str, report_format: Optional[str] = None):
+def match_series_to_template(
+    directory: Path, template: Union[str, dict], report_format: Optional[str] = None
+):
     """Match series in a directory to a template.
 
     Args:
         directory (Path): The directory containing the series to match.
-        template (str): The path to the template JSON file.
+        template (str|dict): The path to the template JSON file, or the loaded template.
         report_format (str): The format of the report to generate (pdf or html). If not
             provided, no report is generated.
     """
 
+    # networkx and pandas are slow to import, so only import them when matching
+    import networkx as nx  # pylint: disable=import-outside-toplevel
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
     # Load templated
     template = load_template(template)
 
     # Load series
-    with open(directory.joinpath("series.json"), "r", encoding="utf-8") as f:
-        series_json = json.load(f)
+    series_json_bytes = directory.joinpath("series.json").read_bytes()
+    series_json = json_loads(series_json_bytes)
 
     # Load series DataFrame
     df = pd.read_csv(directory.joinpath("indexed.csv"))
@@ -37,21 +39,31 @@ def match_series_to_template(directory: Path, template: str, report_format: Opti
         if "referencedSeries" in expected_series[series]:
             expected_graph.add_edge(series, expected_series[series]["referencedSeries"])
 
+    # Take the first instance of each series, and index the series by frame of reference
+    series_rows = (
+        df.drop_duplicates("series_uid").sort_values("series_uid").to_dict("records")
+    )
+    series_uids = {row["series_uid"] for row in series_rows}
+    series_by_for = defaultdict(list)
+    for row in series_rows:
+        if not pd.isna(row["for_uid"]):
+            series_by_for[row["for_uid"]].append(row["series_uid"])
+
     series_graph = nx.DiGraph()
-    for series_uid, df_series in df.groupby("series_uid"):
-        series_graph.add_node(series_uid, **(df_series.iloc[0].to_dict()))
+    for row in series_rows:
+        series_uid = row["series_uid"]
+        series_graph.add_node(series_uid, **row)
 
+        referenced_uid = row["referenced_uid"]
         if (
-            df_series.iloc[0]["referenced_uid"] is not None
-            and not pd.isna(df_series.iloc[0]["referenced_uid"])
-            and len(df[df["series_uid"] == df_series.iloc[0]["referenced_uid"]]) > 0
+            referenced_uid is not None
+            and not pd.isna(referenced_uid)
+            and referenced_uid in series_uids
         ):
-            series_graph.add_edge(series_uid, df_series.iloc[0]["referenced_uid"])
+            series_graph.add_edge(series_uid, referenced_uid)
 
-        if df_series.iloc[0]["for_uid"] is not None:
-            for for_series_uid, _ in df[
-                df.for_uid == df_series.iloc[0]["for_uid"]
-            ].groupby("series_uid"):
+        if not pd.isna(row["for_uid"]):
+            for for_series_uid in series_by_for[row["for_uid"]]:
                 if for_series_uid == series_uid:
                     continue
                 series_graph.add_edge(series_uid, for_series_uid)
@@ -65,7 +77,7 @@ def match_series_to_template(directory: Path, template: str, report_format: Opti
         sub_graph = expected_graph.subgraph(c)
 
         # For each expected series, find the corresponding series in the series graph
-        for expected_series_name in list(nx.topological_sort(sub_graph)):
+        for expected_series_name in nx.topological_sort(sub_graph):
 
             if expected_series_name not in matches:
                 matches[expected_series_name] = []
@@ -81,6 +93,12 @@ def match_series_to_template(directory: Path, template: str, report_format: Opti
             else:
                 series_can_match = matches[expected_series_name].copy()
 
+            # The expected neighbours and their modalities are the same for every series
+            expected_neighbours = [
+                (expected_neighbour, sub_graph.nodes[expected_neighbour]["modality"])
+                for expected_neighbour in sub_graph.successors(expected_series_name)
+            ]
+
             # for each series, check that an edge exist to a series with the expected modality
             for series_uid in series_can_match:
 
@@ -89,13 +107,10 @@ def match_series_to_template(directory: Path, template: str, report_format: Opti
                 neighbours = series_graph.neighbors(series_uid)
 
                 # Check the neighbours have the same modality as the expected series neighbours
-                expected_neighbours = list(sub_graph.successors(expected_series_name))
                 for neighbour in neighbours:
-                    for expected_neighbour in expected_neighbours:
-                        if (
-                            series_graph.nodes[neighbour]["modality"]
-                            == sub_graph.nodes[expected_neighbour]["modality"]
-                        ):
+                    neighbour_modality = series_graph.nodes[neighbour]["modality"]
+                    for expected_neighbour, expected_modality in expected_neighbours:
+                        if neighbour_modality == expected_modality:
                             matches[expected_series_name].append(series_uid)
 
                             if expected_neighbour not in matches:
@@ -108,18 +123,17 @@ def match_series_to_template(directory: Path, template: str, report_format: Opti
         print(f"Match for {series_name}: {matching_series}")
 
     # Update the series json with the matches names
+    series_by_uid = {series["series_uid"]: series for series in series_json["series"]}
     for match_name, matching_series in matches.items():
         for series_uid in matching_series:
-            for series in series_json["series"]:
-                if not series["series_uid"] == series_uid:
-                    continue
+            if series_uid in series_by_uid:
+                series_by_uid[series_uid]["match"] = match_name
 
-                series["match"] = match_name
-
-    with open(directory.joinpath("series.json"), "w", encoding="utf-8") as f:
-        json.dump(series_json, f, indent=2)
+    write_json(directory.joinpath("series.json"), series_json, current=series_json_bytes)
 
     if report_format:
+        from report import generate_series_report  # pylint: disable=import-outside-toplevel
+
         generate_series_report(series_json, directory, report_format=report_format, meta=template["meta"])
 
 if __name__ == "__main__":
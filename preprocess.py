@@ -1,16 +1,21 @@
+from __future__ import annotations
+
 import logging
-import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 from datetime import datetime
-from typing import Union, List, Optional
+from typing import TYPE_CHECKING, Iterator, Union, List, Optional
 from pathlib import Path
 
-import pandas as pd
-import pydicom
-import numpy as np
-import tqdm
+from utils import load_template, write_json
 
-from report import generate_series_report, generate_series_json
-from utils import load_template
+# pandas, pydicom and tqdm are slow to import, so they are imported where they are used to
+# keep the command line interface responsive
+if TYPE_CHECKING:
+    import pandas as pd
+    import pydicom
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +39,60 @@ DICOM_FILE_EXTENSIONS = [
     "DICOM",
 ]
 
+# The only tags scan_file needs, so that the rest of each dataset doesn't need to be parsed
+SCAN_TAGS = [
+    "PatientID",
+    "StudyInstanceUID",
+    "SeriesInstanceUID",
+    "Modality",
+    "SOPClassUID",
+    "SOPInstanceUID",
+    "SeriesDate",
+    "SeriesTime",
+    "StudyDate",
+    "StudyTime",
+    "InstanceCreationDate",
+    "InstanceCreationTime",
+    "FrameOfReferenceUID",
+    "ImagePositionPatient",
+    "ImageOrientationPatient",
+    "ReferencedFrameOfReferenceSequence",
+    "ReferencedStructureSetSequence",
+    "ReferencedRTPlanSequence",
+]
+
+
+def parse_dcm_datetime(date: str, time: str = "") -> datetime:
+    """Parse a DICOM date (DA) and optional time (TM) value. The values are fixed width, so
+    they are sliced directly which is much faster than datetime.strptime.
+
+    Args:
+        date (str): The date in YYYYMMDD format.
+        time (str): The time in HH[MM[SS[.FFFFFF]]] format. Default is no time.
+
+    Returns:
+        datetime: The date/time
+
+    Raises:
+        ValueError: If the date or time are not valid.
+    """
+
+    date = date.strip()
+    time, _, fraction = time.strip().partition(".")
+
+    if len(date) != 8 or not date.isdigit():
+        raise ValueError(f"Invalid DICOM date: {date}")
+
+    return datetime(
+        int(date[0:4]),
+        int(date[4:6]),
+        int(date[6:8]),
+        int(time[0:2] or 0),
+        int(time[2:4] or 0),
+        int(time[4:6] or 0),
+        int(fraction[:6].ljust(6, "0") or 0),
+    )
+
 
 def determine_dcm_datetime(ds: pydicom.Dataset, require_time: bool = False) -> datetime:
     """Get a date/time value from a DICOM dataset. Will attempt to pull from SeriesDate/SeriesTime
@@ -55,16 +114,12 @@ def determine_dcm_datetime(ds: pydicom.Dataset, require_time: bool = False) -> d
         type_time = f"{date_type}Time"
         if type_date in ds and len(ds[type_date].value) > 0:
             if type_time in ds and len(ds[type_time].value) > 0:
-                date_time_str = f"{ds[type_date].value}{ds[type_time].value}"
-                if "." in date_time_str:
-                    return datetime.strptime(date_time_str, "%Y%m%d%H%M%S.%f")
-
-                return datetime.strptime(date_time_str, "%Y%m%d%H%M%S")
+                return parse_dcm_datetime(str(ds[type_date].value), str(ds[type_time].value))
 
             if require_time:
                 continue
 
-            return datetime.strptime(ds[type_date].value, "%Y%m%d")
+            return parse_dcm_datetime(str(ds[type_date].value))
 
     return None
 
@@ -74,6 +129,7 @@ def scan_file(file: Union[str, Path], meta: List[str]) -> dict:
 
     Args:
         file (pathlib.Path|str): The path to the file to scan.
+        meta (list): Additional metadata tags to read.
 
     Returns:
         dict: Returns the dict object containing the scanned information. None if the file
@@ -82,11 +138,15 @@ def scan_file(file: Union[str, Path], meta: List[str]) -> dict:
         str: Error message if the scan failed.
     """
 
+    import pydicom  # pylint: disable=import-outside-toplevel
+
     res_dict = None
     status = "ok"
 
     try:
-        ds = pydicom.read_file(file, force=True)
+        ds = pydicom.dcmread(
+            file, force=True, stop_before_pixels=True, specific_tags=SCAN_TAGS + meta
+        )
 
         dicom_type_uid = ds.SOPClassUID
 
@@ -157,14 +217,12 @@ def scan_file(file: Union[str, Path], meta: List[str]) -> dict:
             PET_IMAGE_STORAGE_UID,
             MR_IMAGE_STORAGE_UID,
         ):
-            image_position = np.array(ds.ImagePositionPatient, dtype=float)
-            image_orientation = np.array(ds.ImageOrientationPatient, dtype=float)
-
-            image_plane_normal = np.cross(image_orientation[:3], image_orientation[3:])
+            # The slice location is the z component of the image position projected onto the
+            # image plane normal (the cross product of the row and column direction cosines)
+            row_x, row_y, _, col_x, col_y, _ = map(float, ds.ImageOrientationPatient)
+            normal_z = row_x * col_y - row_y * col_x
 
-            slice_location = (image_position * image_plane_normal)[2]
-
-            res_dict["slice_location"] = slice_location
+            res_dict["slice_location"] = float(ds.ImagePositionPatient[2]) * normal_z
 
         logger.debug(
             "Successfully scanned DICOM file with SOP Instance UID: %s",
@@ -182,10 +240,43 @@ def scan_file(file: Union[str, Path], meta: List[str]) -> dict:
     return res_dict, status, error
 
 
+def _iter_dicom_files(directory: Path, enforce_dcm_ext: bool = True) -> Iterator[Path]:
+    """Recursively find files in a directory with a single walk of the directory tree.
+
+    Args:
+        directory (pathlib.Path): The directory to search.
+        enforce_dcm_ext (bool): Only yield files with a DICOM file extension (case
+            insensitive).
+
+    Yields:
+        pathlib.Path: The path of each file found.
+    """
+
+    extensions = {ext.lower() for ext in DICOM_FILE_EXTENSIONS}
+
+    directories = [directory]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                    continue
+
+                if not entry.is_file():
+                    continue
+
+                extension = os.path.splitext(entry.name)[1][1:].lower()
+                if enforce_dcm_ext and extension not in extensions:
+                    continue
+
+                yield Path(entry.path)
+
+
 def index_dicom_files(
     input_directory: Union[Path, list],
     meta: Union[List[str], None] = None,
     enforce_dcm_ext: bool = True,
+    max_workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Index DICOM files in a directory.
 
@@ -193,11 +284,16 @@ def index_dicom_files(
         input_directory (pathlib.Path|list): The directory to index.
         meta (list): Additional metadata to include in the index.
         enforce_dcm_ext (bool): Enforce DICOM file extension.
+        max_workers (int): The number of processes to scan files with. If not provided, one
+            per CPU is used. If 1, files are scanned in the current process.
 
     Returns:
         pd.DataFrame: DataFrame of indexed files.
     """
 
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import tqdm  # pylint: disable=import-outside-toplevel
+
     if isinstance(input_directory, str):
         input_directory = Path(input_directory)
 
@@ -226,28 +322,40 @@ def index_dicom_files(
 
     columns += meta
 
-    files = []
+    files = list(_iter_dicom_files(input_directory, enforce_dcm_ext=enforce_dcm_ext))
 
-    if enforce_dcm_ext:
-        for ext in DICOM_FILE_EXTENSIONS:
-            files += list(input_directory.glob(f"**/*.{ext}"))
-    else:
-        files += list(f for f in input_directory.glob("**/*") if not f.is_dir())
+    # Collect the results column by column, so the DataFrame doesn't need to be built from
+    # a list of dicts
+    data = {column: [] for column in columns}
 
-    result_list = []
+    # Scanning is CPU bound and independent per file, so spread it across processes. Send
+    # files in chunks to amortise the inter-process communication overhead.
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
 
-    for f in tqdm.tqdm(files, desc="Indexing", total=len(files)):
-        result, status, error = scan_file(f, meta=meta)
+    scan = partial(scan_file, meta=meta)
 
-        if status == "error":
-            logger.warning("A problem occurred with file %s", f)
-            logger.warning("Error: %s", error)
-            continue
+    with ExitStack() as stack:
+        if max_workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+            chunksize = max(1, len(files) // (max_workers * 8))
+            scanned = executor.map(scan, files, chunksize=chunksize)
+        else:
+            scanned = map(scan, files)
 
-        if result is not None:
-            result_list.append(result)
+        for f, (result, status, error) in tqdm.tqdm(
+            zip(files, scanned), desc="Indexing", total=len(files)
+        ):
+            if status == "error":
+                logger.warning("A problem occurred with file %s", f)
+                logger.warning("Error: %s", error)
+                continue
 
-    df = pd.DataFrame(result_list, columns=columns)
+            if result is not None:
+                for column, values in data.items():
+                    values.append(result.get(column))
+
+    df = pd.DataFrame(data, columns=columns)
 
     # Sort the the DataFrame by the patient then series uid and the slice location, ensuring
     # that the slices are ordered correctly
@@ -260,26 +368,34 @@ def index_dicom_files(
 
 def preprocess(
     input_directory: Union[Path, list],
-    template: Union[str, None] = None,
+    template: Union[str, dict, None] = None,
     enforce_dcm_ext: bool = True,
     report_format: Optional[str] = None,
     output_directory: Optional[Path] = None,
+    max_workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Preprocess DICOM files in a directory.
 
     Args:
         input_directory (pathlib.Path|list): The directory to preprocess.
-        template (str): Path to template file defining meta fields.
+        template (str|dict): Path to template file defining meta fields, or the loaded
+            template.
         enforce_dcm_ext (bool): Enforce DICOM file extension.
         report_format (str): The format of the report to generate (pdf or html). If not
             provided, no report is generated.
         output_directory (pathlib.Path): The output directory to save the report to. If not
             provided, the input directory will be used.
+        max_workers (int): The number of processes to scan files with. If not provided, one
+            per CPU is used.
 
     Returns:
         pd.DataFrame: DataFrame of indexed files.
     """
 
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    from report import generate_series_json  # pylint: disable=import-outside-toplevel
+
     meta = []
     if template is not None:
         template = load_template(template)
@@ -293,20 +409,20 @@ def preprocess(
         input_directory=input_directory,
         meta=meta,
         enforce_dcm_ext=enforce_dcm_ext,
+        max_workers=max_workers,
     )
 
     # Sort the dataframe by modality, first CT, then MR, then PT, then RTSTRUCT, then
     # RTPLAN, then RTDOSE
     modality_order = ["CT", "MR", "PT", "RTSTRUCT", "RTPLAN", "RTDOSE"]
+    modality_rank = {m: i for i, m in enumerate(modality_order)}
     for m in df.modality.unique():
-        if m not in modality_order:
-            modality_order.append(m)
-    df["modality"] = pd.Categorical(
-        df["modality"], categories=modality_order, ordered=True
+        modality_rank.setdefault(m, len(modality_rank))
+    df = df.sort_values(
+        ["modality"], key=lambda modality: modality.map(modality_rank), kind="stable"
     )
-    df = df.sort_values(["modality"])
 
-    input_directory.joinpath("indexed.csv").write_text(df.to_csv(index=False))
+    df.to_csv(input_directory.joinpath("indexed.csv"), index=False)
 
     # Check we only have one patient
     pat_ids = df["patient_id"].unique()
@@ -318,10 +434,11 @@ def preprocess(
     # Prepare a JSON with information on series found
     series_json = generate_series_json(df, meta=meta)
 
-    with open(input_directory.joinpath("series.json"), "w", encoding="utf-8") as f:
-        json.dump(series_json, f, indent=2)
+    write_json(input_directory.joinpath("series.json"), series_json)
 
     if report_format:
+        from report import generate_series_report  # pylint: disable=import-outside-toplevel
+
         generate_series_report(series_json, input_directory, report_format, meta)
 
 
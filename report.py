@@ -1,6 +1,8 @@
 import logging
+import mmap
+from html import escape
 
-from typing import List, Optional, Union
+from typing import List, Optional, Set, Tuple, Union
 from pathlib import Path
 
 import pandas as pd
@@ -15,6 +17,37 @@ logging.basicConfig(
     level=logging.INFO, format="%(asctime)s -%(levelname)s - %(message)s"
 )
 
+# The only tags needed from RTSTRUCT and RTDOSE files, so the contours and dose grid don't
+# need to be parsed
+_RTSTRUCT_TAGS = ["StructureSetROISequence"]
+_RTDOSE_TAGS = ["DoseSummationType"]
+
+# Fonts used in PDF reports, as found in the font pack fetched by ensure_font_pack
+FONT_DIRECTORY = Path("font")
+_PDF_FONTS = {
+    "DejaVu": "DejaVuSansCondensed.ttf",
+    "DejaVuBold": "DejaVuSansCondensed-Bold.ttf",
+}
+
+# Set once the font pack is known to be available
+_font_pack_ready = False
+
+
+def read_dicom_header(file_path: Union[str, Path], tags: List[str]) -> pydicom.Dataset:
+    """Read selected tags from the header of a DICOM file, without the pixel data.
+
+    Args:
+        file_path (str|pathlib.Path): The path of the DICOM file.
+        tags (List[str]): The keywords of the tags to read.
+
+    Returns:
+        pydicom.Dataset: The dataset containing only the requested tags.
+    """
+    # Parse from a memory map, so reads are served straight from the page cache rather than
+    # being copied through Python's file buffer
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return pydicom.dcmread(mm, force=True, stop_before_pixels=True, specific_tags=tags)
+
 
 def fetch_structure_names(ds: pydicom.Dataset) -> List[str]:
     """Fetch the structure names from a DICOM RTSTRUCT file.
@@ -26,12 +59,7 @@ def fetch_structure_names(ds: pydicom.Dataset) -> List[str]:
         List[str]: The list of structure names.
     """
 
-    structure_names = []
-
-    for item in ds.StructureSetROISequence:
-        structure_names.append(item.ROIName)
-
-    return structure_names
+    return [item.ROIName for item in ds.StructureSetROISequence]
 
 
 def parse_nan_value(value: object) -> Optional[object]:
@@ -48,6 +76,50 @@ def parse_nan_value(value: object) -> Optional[object]:
     return value
 
 
+def _slice_statistics(
+    series_uids: np.ndarray, slice_locations: np.ndarray
+) -> Tuple[pd.Series, Set[str]]:
+    """Find the slice spacings and duplicated slices of image series.
+
+    A single difference between neighbouring slices is computed for all series at once, and
+    used for both the spacings and the duplicates.
+
+    Args:
+        series_uids (np.ndarray): The series UID of each slice.
+        slice_locations (np.ndarray): The location of each slice. Must be sorted by series,
+            then by slice location.
+
+    Returns:
+        pd.Series: The sorted unique slice spacings (rounded to 2 decimals) of each series.
+        Set[str]: The UIDs of the series with duplicated slices.
+    """
+
+    # Only differences between slices of the same series are relevant
+    same_series = series_uids[1:] == series_uids[:-1]
+    slice_diffs = np.diff(slice_locations)
+
+    # Slices are duplicated if at the same location as the previous slice (missing locations
+    # are sorted last, so are also neighbours)
+    duplicated = same_series & (
+        (slice_diffs == 0) | (np.isnan(slice_locations[1:]) & np.isnan(slice_locations[:-1]))
+    )
+    duplicated_series = set(series_uids[1:][duplicated])
+
+    np.round(slice_diffs, 2, out=slice_diffs)
+
+    spacings = (
+        pd.DataFrame(
+            {"series_uid": series_uids[1:][same_series], "spacing": slice_diffs[same_series]}
+        )
+        .drop_duplicates()
+        .sort_values("spacing")
+        .groupby("series_uid", sort=False)["spacing"]
+        .agg(list)
+    )
+
+    return spacings, duplicated_series
+
+
 def generate_series_json(df: pd.DataFrame, meta: Union[List[str], None] = None) -> dict:
     """Generate a JSON object containing series information.
 
@@ -65,60 +137,92 @@ def generate_series_json(df: pd.DataFrame, meta: Union[List[str], None] = None)
         "patient_id": pat_ids[0],
         "series": [],
     }
-    for series_uid, df_series in df.groupby("series_uid", sort=False):
+
+    # Group on integer category codes rather than hashing the UID strings for every
+    # aggregation (astype returns a copy, so the caller's DataFrame is left as it is)
+    df = df.astype({"series_uid": "category", "modality": "category"})
+
+    # Dates may have been read back as strings (e.g. from indexed.csv), so parse them once
+    if not pd.api.types.is_datetime64_any_dtype(df["date_time"]):
+        df["date_time"] = pd.to_datetime(df["date_time"], errors="coerce")
+
+    series_groups = df.groupby("series_uid", sort=False, observed=True)
+
+    # Count the distinct values per series of the fields which must be consistent within a
+    # series, in a single aggregation over all series
+    unique_counts = series_groups[["modality", "for_uid", "referenced_uid"]].nunique(
+        dropna=False
+    )
+    instance_counts = series_groups.size()
+
+    inconsistent = unique_counts[(unique_counts > 1).any(axis=1)]
+    if len(inconsistent) > 0:
+        series_uid = inconsistent.index[0]
+        counts = inconsistent.iloc[0]
+
         # Check all the series have the same modality
-        if len(df_series["modality"].unique()) > 1:
+        if counts["modality"] > 1:
             raise ValueError(f"Series {series_uid} has multiple modalities")
         # Check all instances in series have the same frame of reference
-        if len(df_series["for_uid"].unique()) > 1:
+        if counts["for_uid"] > 1:
             raise ValueError(f"Series {series_uid} has multiple frame of references")
 
         # Check all instances in series have the same referenced series
-        if len(df_series["referenced_uid"].unique()) > 1:
-            raise ValueError(f"Series {series_uid} has multiple referenced series")
+        raise ValueError(f"Series {series_uid} has multiple referenced series")
+
+    # Find the slice spacings of all image series in one pass, with the slices of every
+    # series sorted together
+    df_images = df[df["modality"].isin(["CT", "MR", "PT"])].sort_values(
+        ["series_uid", "slice_location"]
+    )
+    slice_spacings, duplicated_slice_series = _slice_statistics(
+        df_images["series_uid"].to_numpy(), df_images["slice_location"].to_numpy(dtype=float)
+    )
+
+    # Report the first date/time found in each series, formatted for all series at once
+    series_date_times = series_groups["date_time"].first().dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
 
-        date_time = df_series["date_time"].unique()
-        date_time = [dt.isoformat() for dt in date_time if not pd.isna(dt)]
-        if len(date_time) > 1:
-            date_time = date_time[0]
+    # The fields reported for each series are taken from its first instance, so take those
+    # rows once rather than indexing into each group
+    first_instances = df.drop_duplicates("series_uid", keep="first").to_dict("records")
+
+    for first in first_instances:
+        series_uid = first["series_uid"]
+        modality = first["modality"]
 
         entry = {
             "series_uid": series_uid,
-            "modality": df_series["modality"].iloc[0],
-            "date_time": date_time,
-            "frame_of_reference": parse_nan_value(df_series["for_uid"].iloc[0]),
-            "referenced_series": parse_nan_value(df_series["referenced_uid"].iloc[0]),
-            "instance_count": len(df_series["sop_instance_uid"]),
+            "modality": modality,
+            "date_time": parse_nan_value(series_date_times[series_uid]),
+            "frame_of_reference": parse_nan_value(first["for_uid"]),
+            "referenced_series": parse_nan_value(first["referenced_uid"]),
+            "instance_count": int(instance_counts[series_uid]),
         }
 
         if meta is not None:
             for m in meta:
-                entry[m] = parse_nan_value(df_series[m].iloc[0])
+                entry[m] = parse_nan_value(first[m])
 
         # For images, check consistency of slices
-        if df_series["modality"].iloc[0] in ["CT", "MR", "PT"]:
-            slice_locs = df_series.slice_location.to_numpy()
-            slice_locs.sort()
-            slice_diffs = np.diff(slice_locs)
-            slice_diffs = np.round(slice_diffs, 2)
-            slice_diffs = np.unique(slice_diffs)
-
-            if len(slice_diffs) > 1:
+        if modality in ["CT", "MR", "PT"]:
+            spacings = slice_spacings.get(series_uid, [])
+
+            if len(spacings) > 1:
                 entry["consistent_slice_spacing"] = False
-                entry["slice_spacing"] = slice_diffs.tolist()
-            if len(slice_diffs) == 0:
+                entry["slice_spacing"] = spacings
+            elif len(spacings) == 0:
                 entry["consistent_slice_spacing"] = False
                 entry["slice_spacing"] = np.nan
             else:
                 entry["consistent_slice_spacing"] = True
-                entry["slice_spacing"] = slice_diffs[0]
+                entry["slice_spacing"] = spacings[0]
 
-            entry["duplicated_slices"] = len(slice_locs) != len(np.unique(slice_locs))
+            entry["duplicated_slices"] = series_uid in duplicated_slice_series
 
         # Fetch structure names for RTSTRUCT
-        if df_series["modality"].iloc[0] == "RTSTRUCT":
+        if modality == "RTSTRUCT":
             try:
-                ds = pydicom.read_file(df_series["file_path"].iloc[0], force=True)
+                ds = read_dicom_header(first["file_path"], _RTSTRUCT_TAGS)
                 entry["structure_names"] = fetch_structure_names(ds)
             except Exception as e:  # pylint: disable=broad-except
                 logger.error(
@@ -127,9 +231,9 @@ def generate_series_json(df: pd.DataFrame, meta: Union[List[str], None] = None)
                 logger.error(str(e))
 
         # Fetch DoseSummationType for RTDOSE
-        if df_series["modality"].iloc[0] == "RTDOSE":
+        if modality == "RTDOSE":
             try:
-                ds = pydicom.read_file(df_series["file_path"].iloc[0], force=True)
+                ds = read_dicom_header(first["file_path"], _RTDOSE_TAGS)
                 entry["dose_summation_type"] = ds.DoseSummationType
             except Exception as e:  # pylint: disable=broad-except
                 logger.error(
@@ -142,6 +246,61 @@ def generate_series_json(df: pd.DataFrame, meta: Union[List[str], None] = None)
     return series_json
 
 
+def ensure_font_pack():
+    """Download the font pack required for PDF generation if it isn't already available.
+
+    The check is only made once per process, so generating many reports doesn't hit the
+    filesystem again for each one.
+    """
+    global _font_pack_ready  # pylint: disable=global-statement
+
+    if _font_pack_ready:
+        return
+
+    if not all(FONT_DIRECTORY.joinpath(f).exists() for f in _PDF_FONTS.values()):
+        download_font_pack(Path("."))
+
+    _font_pack_ready = True
+
+
+def _new_report_pdf():
+    """Create an FPDF document with the report fonts registered.
+
+    Returns:
+        fpdf.FPDF: The PDF document, ready for the first page to be added.
+    """
+    from fpdf import FPDF  # pylint: disable=import-outside-toplevel
+
+    ensure_font_pack()
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    for family, file_name in _PDF_FONTS.items():
+        pdf.add_font(family, "", str(FONT_DIRECTORY.joinpath(file_name)), uni=True)
+
+    return pdf
+
+
+def _format_check(check: dict) -> Tuple[str, List[str]]:
+    """Format the result of a check for the report.
+
+    Args:
+        check (dict): The check result, as stored in the series JSON.
+
+    Returns:
+        str: The line giving the check description and whether it passed.
+        List[str]: The indented non-empty lines of the check output.
+    """
+
+    mark, status = ("✓", "Passed") if check["passed"] else ("✗", "Failed")
+
+    output = []
+    if check["output"]:
+        output = [f"    {part}" for part in check["output"].split("\n") if part]
+
+    return f"{mark} {check['description']}: {status}", output
+
+
 def generate_series_report(
     series_json: dict,
     output_directory: Path,
@@ -162,9 +321,15 @@ def generate_series_report(
     if not output_directory.exists():
         output_directory.mkdir(parents=True)
 
+    # Split the checks once for the critical and other sections of the report
+    all_checks = series_json.get("checks", [])
+    check_sections = [
+        ("Critical checks", [check for check in all_checks if check["critical"]]),
+        ("Other checks", [check for check in all_checks if not check["critical"]]),
+    ]
+
     if report_format == "pdf":
         try:
-            from fpdf import FPDF  # pylint: disable=import-outside-toplevel
             from fpdf.enums import XPos, YPos  # pylint: disable=import-outside-toplevel
         except ImportError:
             logger.error(
@@ -172,12 +337,7 @@ def generate_series_report(
             )
             return
 
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        if not Path("fonts/DejaVuSansCondensed.ttf").exists():
-            download_font_pack(Path("."))
-        pdf.add_font("DejaVu", "", "font/DejaVuSansCondensed.ttf", uni=True)
-        pdf.add_font("DejaVuBold", "", "font/DejaVuSansCondensed-Bold.ttf", uni=True)
+        pdf = _new_report_pdf()
         pdf.add_page()
         pdf.set_font("DejaVu", size=12)
 
@@ -192,6 +352,13 @@ def generate_series_report(
 
         pdf.ln(5)
 
+        def text_block(block: List[str]):
+            """Write lines of text at the current font with a single multi_cell call."""
+            if block:
+                pdf.multi_cell(
+                    200, 5, "\n".join(block), new_x=XPos.LMARGIN, new_y=YPos.NEXT
+                )
+
         if "checks" in series_json:
             pdf.set_font("DejaVu", size=14)
             pdf.cell(
@@ -201,76 +368,24 @@ def generate_series_report(
                 new_x=XPos.LMARGIN,
                 new_y=YPos.NEXT,
             )
-            pdf.set_font("DejaVuBold", size=10)
-
-            pdf.cell(
-                200,
-                5,
-                "Critical checks",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
-            pdf.set_font("DejaVu", size=10)
-
-            for check in series_json["checks"]:
-                if not check["critical"]:
-                    continue
-
-                mark = "✓" if check["passed"] else "✗"
+            for heading, checks in check_sections:
+                pdf.set_font("DejaVuBold", size=10)
 
                 pdf.cell(
                     200,
                     5,
-                    f" {mark} {check['description']}: {'Passed' if check['passed'] else 'Failed'}",
+                    heading,
                     new_x=XPos.LMARGIN,
                     new_y=YPos.NEXT,
                 )
-                if check["output"]:
-                    for part in check["output"].split("\n"):
-                        if len(part) == 0:
-                            continue
-                        pdf.cell(
-                            200,
-                            5,
-                            f"    {part}",
-                            new_x=XPos.LMARGIN,
-                            new_y=YPos.NEXT,
-                        )
-            pdf.set_font("DejaVuBold", size=10)
-
-            pdf.cell(
-                200,
-                5,
-                "Other checks",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
-            pdf.set_font("DejaVu", size=10)
-
-            for check in series_json["checks"]:
-                if check["critical"]:
-                    continue
+                pdf.set_font("DejaVu", size=10)
 
-                mark = "✓" if check["passed"] else "✗"
-
-                pdf.cell(
-                    200,
-                    5,
-                    f" {mark} {check['description']}: {'Passed' if check['passed'] else 'Failed'}",
-                    new_x=XPos.LMARGIN,
-                    new_y=YPos.NEXT,
-                )
-                if check["output"]:
-                    for part in check["output"].split("\n"):
-                        if len(part) == 0:
-                            continue
-                        pdf.cell(
-                            200,
-                            5,
-                            f"    {part}",
-                            new_x=XPos.LMARGIN,
-                            new_y=YPos.NEXT,
-                        )
+                block = []
+                for check in checks:
+                    result, output = _format_check(check)
+                    block.append(f" {result}")
+                    block.extend(output)
+                text_block(block)
 
             pdf.ln(5)
 
@@ -285,186 +400,112 @@ def generate_series_report(
         pdf.set_font("DejaVu", size=10)
 
         for series in series_json["series"]:
-            pdf.cell(
-                200,
-                5,
-                f"  - Series UID: {series['series_uid']}",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
+            text_block([f"  - Series UID: {series['series_uid']}"])
             if "match" in series:
                 pdf.set_font("DejaVuBold", size=10)
-                pdf.cell(
-                    200,
-                    5,
-                    f"  - Match: {series['match']}",
-                    new_x=XPos.LMARGIN,
-                    new_y=YPos.NEXT,
-                )
+                text_block([f"  - Match: {series['match']}"])
                 pdf.set_font("DejaVu", size=10)
-            pdf.cell(
-                200,
-                5,
+
+            block = [
                 f"  - Frame of Reference UID: {series['frame_of_reference']}",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
-            pdf.cell(
-                200,
-                5,
                 f"  - Referenced Series UID: {series['referenced_series']}",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
-            pdf.cell(
-                200,
-                5,
                 f"  - Modality: {series['modality']}",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
-            pdf.cell(
-                200,
-                5,
                 f"  - Date/Time: {series['date_time']}",
-                new_x=XPos.LMARGIN,
-                new_y=YPos.NEXT,
-            )
+            ]
 
             if series["modality"] in ["CT", "MR", "PT"]:
-                pdf.cell(
-                    200,
-                    5,
-                    f"  - Slice Spacing: {series['slice_spacing']}",
-                    new_x=XPos.LMARGIN,
-                    new_y=YPos.NEXT,
-                )
-                pdf.cell(
-                    200,
-                    5,
-                    f"  - Consistent Slice Spacing: {series['consistent_slice_spacing']}",
-                    new_x=XPos.LMARGIN,
-                    new_y=YPos.NEXT,
-                )
-                pdf.cell(
-                    200,
-                    5,
-                    f"  - Duplicated Slices: {series['duplicated_slices']}",
-                    new_x=XPos.LMARGIN,
-                    new_y=YPos.NEXT,
+                block.append(f"  - Slice Spacing: {series['slice_spacing']}")
+                block.append(
+                    f"  - Consistent Slice Spacing: {series['consistent_slice_spacing']}"
                 )
+                block.append(f"  - Duplicated Slices: {series['duplicated_slices']}")
 
             if series["modality"] == "RTSTRUCT":
-                pdf.cell(
-                    200, 5, "  - Structure Names:", new_x=XPos.LMARGIN, new_y=YPos.NEXT
-                )
-                for name in series["structure_names"]:
-                    pdf.cell(
-                        200, 5, f"      {name}", new_x=XPos.LMARGIN, new_y=YPos.NEXT
-                    )
+                block.append("  - Structure Names:")
+                block.extend(f"      {name}" for name in series["structure_names"])
 
             if series["modality"] == "RTDOSE":
-                pdf.cell(
-                    200,
-                    5,
-                    f"  - Dose Summation Type: {series['dose_summation_type']}",
-                    new_x=XPos.LMARGIN,
-                    new_y=YPos.NEXT,
-                )
+                block.append(f"  - Dose Summation Type: {series['dose_summation_type']}")
 
             if meta:
-                for m in meta:
-                    pdf.cell(
-                        200,
-                        5,
-                        f"  - {m}: {series[m]}",
-                        new_x=XPos.LMARGIN,
-                        new_y=YPos.NEXT,
-                    )
+                block.extend(f"  - {m}: {series[m]}" for m in meta)
+
+            text_block(block)
 
             pdf.ln(5)
 
         pdf.output(output_directory.joinpath("series_report.pdf"))
 
     elif report_format == "html":
-        try:
-            import dominate  # pylint: disable=import-outside-toplevel
-            from dominate.tags import h1, h2, h3, p, table, tr, td, b  # pylint: disable=import-outside-toplevel
-        except ImportError:
-            logger.error(
-                "The dominate package is required for HTML output: pip install dominate"
+        # The report is plain markup, so build it as a list of lines and join it once
+        lines = [
+            "<!DOCTYPE html>",
+            "<html>",
+            "  <head>",
+            "    <title>DICOM Series Report</title>",
+            "  </head>",
+            "  <body>",
+            "    <h1>Series Report</h1>",
+        ]
+
+        def para(text=""):
+            lines.append(f"    <p>{escape(str(text), quote=False)}</p>")
+
+        if "checks" in series_json:
+            lines.append("    <h2>Check results</h2>")
+            for heading, checks in check_sections:
+                lines.append(f"    <h3>{heading}</h3>")
+                for check in checks:
+                    result, output = _format_check(check)
+                    para(result)
+                    for part in output:
+                        para(part)
+
+        lines.append("    <h2>Series Information</h2>")
+
+        for series in series_json["series"]:
+            lines.append(
+                f"    <h3>Series UID: {escape(str(series['series_uid']), quote=False)}</h3>"
             )
-            return
+            if "match" in series:
+                lines.append("    <p>")
+                lines.append(f"      <b>Match: {escape(str(series['match']), quote=False)}</b>")
+                lines.append("    </p>")
+
+            para(f"Frame of Reference UID: {series['frame_of_reference']}")
+            para(f"Referenced Series UID: {series['referenced_series']}")
+            para(f"Modality: {series['modality']}")
+            para(f"Date/Time: {series['date_time']}")
+
+            if series["modality"] in ["CT", "MR", "PT"]:
+                para(f"Slice Spacing: {series['slice_spacing']}")
+                para(f"Consistent Slice Spacing: {series['consistent_slice_spacing']}")
+                para(f"Duplicated Slices: {series['duplicated_slices']}")
+
+            if series["modality"] == "RTSTRUCT":
+                para("Structure Names:")
+                lines.append("    <table>")
+                for name in series["structure_names"]:
+                    lines.append("      <tr>")
+                    lines.append(f"        <td>{escape(str(name), quote=False)}</td>")
+                    lines.append("      </tr>")
+                lines.append("    </table>")
+
+            if series["modality"] == "RTDOSE":
+                para(f"Dose Summation Type: {series['dose_summation_type']}")
+
+            if meta:
+                for m in meta:
+                    para(f"{m}: {series[m]}")
+
+            para()
 
-        doc = dominate.document(title="DICOM Series Report")
-
-        with doc:
-            h1("Series Report")
-
-            if "checks" in series_json:
-                h2("Check results")
-                h3("Critical checks")
-                for check in series_json["checks"]:
-                    if not check["critical"]:
-                        continue
-
-                    mark = "✓" if check["passed"] else "✗"
-                    p(f"{mark} {check['description']}: {'Passed' if check['passed'] else 'Failed'}")
-                    if check["output"]:
-                        for part in check["output"].split("\n"):
-                            if len(part) == 0:
-                                continue
-                            p(f"    {part}")
-
-                h3("Other checks")
-                for check in series_json["checks"]:
-                    if check["critical"]:
-                        continue
-
-                    mark = "✓" if check["passed"] else "✗"
-                    p(f"{mark} {check['description']}: {'Passed' if check['passed'] else 'Failed'}")
-                    if check["output"]:
-                        for part in check["output"].split("\n"):
-                            if len(part) == 0:
-                                continue
-                            p(f"    {part}")
-
-            h2("Series Information")
-
-            for series in series_json["series"]:
-                h3(f"Series UID: {series['series_uid']}")
-                if "match" in series:
-                    p(b(f"Match: {series['match']}"))
-
-                p(f"Frame of Reference UID: {series['frame_of_reference']}")
-                p(f"Referenced Series UID: {series['referenced_series']}")
-                p(f"Modality: {series['modality']}")
-                p(f"Date/Time: {series['date_time']}")
-
-                if series["modality"] in ["CT", "MR", "PT"]:
-                    p(f"Slice Spacing: {series['slice_spacing']}")
-                    p(f"Consistent Slice Spacing: {series['consistent_slice_spacing']}")
-                    p(f"Duplicated Slices: {series['duplicated_slices']}")
-
-                if series["modality"] == "RTSTRUCT":
-                    p("Structure Names:")
-                    with table():
-                        for name in series["structure_names"]:
-                            with tr():
-                                td(name)
-
-                if series["modality"] == "RTDOSE":
-                    p(f"Dose Summation Type: {series['dose_summation_type']}")
-
-                if meta:
-                    for m in meta:
-                        p(f"{m}: {series[m]}")
-
-                p()
+        lines.append("  </body>")
+        lines.append("</html>")
 
         with open(
             output_directory.joinpath("series_report.html"), "w", encoding="utf-8"
         ) as f:
-            f.write(str(doc))
+            f.write("\n".join(lines))
 
     logger.info("Generated series report in %s format", report_format)
@@ -1,63 +1,114 @@
-import json
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
-import pandas as pd
-
 from preprocess import preprocess
 from match import match_series_to_template
 from check import perform_checks
+from utils import load_template, json_loads
 
-def run_on_all_subdirectories(directory: Path, template: str, report_format: Optional[str] = None):
-    """Run a script on all sub-directories in a directory.
+
+def _process_subdirectory(
+    subdirectory: Path, template: dict, report_format: Optional[str] = None
+) -> dict:
+    """Preprocess, match and check a single sub-directory.
 
     Args:
-        directory (Path): The directory to process.
-        template (str): The path to the template JSON file.
+        subdirectory (Path): The sub-directory to process.
+        template (dict): The loaded template.
         report_format (str): The format of the report to generate (pdf or html). If not
             provided, no report is generated.
+
+    Returns:
+        dict: The check results for the sub-directory.
     """
 
-    check_results = []
+    # Sub-directories are already processed in parallel, so scan files in this process
+    preprocess(
+        input_directory=subdirectory,
+        template=template,
+        report_format=report_format,
+        output_directory=subdirectory,
+        max_workers=1,
+    )
+
+    match_series_to_template(
+        directory=subdirectory,
+        template=template,
+        report_format=report_format,
+    )
+
+    perform_checks(
+        directory=subdirectory,
+        template=template,
+        report_format=report_format,
+    )
+
+    # Load the series json and extract checks
+    series_json = json_loads(subdirectory.joinpath("series.json").read_bytes())
 
-    for subdirectory in directory.iterdir():
-        if subdirectory.is_dir():
-            preprocess(
-                input_directory=subdirectory,
-                template=template,
-                report_format=report_format,
-                output_directory=subdirectory,
-            )
+    entry = {
+        "directory": subdirectory
+    }
 
-            match_series_to_template(
-                directory=subdirectory,
-                template=template,
-                report_format=report_format,
-            )
+    checks = {}
+    for check in series_json["checks"]:
+        checks[check["description"]] = check["passed"]
+
+    entry = {**entry, **checks}
+
+    return entry
+
+
+def run_on_all_subdirectories(
+    directory: Path,
+    template: str,
+    report_format: Optional[str] = None,
+    max_workers: Optional[int] = None,
+):
+    """Run a script on all sub-directories in a directory.
+
+    Args:
+        directory (Path): The directory to process.
+        template (str): The path to the template JSON file.
+        report_format (str): The format of the report to generate (pdf or html). If not
+            provided, no report is generated.
+        max_workers (int): The number of sub-directories to process in parallel. If not
+            provided, one per CPU is used.
+    """
 
-            perform_checks(
-                directory=subdirectory,
-                template=template,
-                report_format=report_format,
-            )
+    # Load the template once, rather than in each step for every sub-directory
+    template = load_template(template)
 
-            # Load the series json and extract checks
-            with open(subdirectory.joinpath("series.json"), "r", encoding="utf-8") as f:
-                series_json = json.load(f)
+    subdirectories = [d for d in directory.iterdir() if d.is_dir()]
 
-            entry = {
-                "directory": subdirectory
-            }
+    if report_format == "pdf":
+        # Fetch the fonts up front so that the workers don't all try to download them
+        from report import ensure_font_pack  # pylint: disable=import-outside-toplevel
 
-            checks = {}
-            for check in series_json["checks"]:
-                checks[check["description"]] = check["passed"]
+        ensure_font_pack()
 
-            entry = {**entry, **checks}
+    # There is a column for each check in the template, so the header can be written before
+    # any sub-directory is processed
+    fieldnames = ["directory", *dict.fromkeys(c["description"] for c in template["checks"])]
 
-            check_results.append(entry)
+    with open(
+        directory.joinpath("check_results.csv"), "w", newline="", encoding="utf-8"
+    ) as f, ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator=os.linesep)
+        writer.writeheader()
 
-    pd.DataFrame(check_results).to_csv(directory.joinpath("check_results.csv"), index=False)
+        # Write each result as soon as it is available, so the file can be followed during
+        # a long run
+        for entry in executor.map(
+            partial(_process_subdirectory, template=template, report_format=report_format),
+            subdirectories,
+        ):
+            writer.writerow(entry)
+            f.flush()
 
 
 if __name__ == "__main__":
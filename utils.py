@@ -1,46 +1,188 @@
 import json
-import requests
+import functools
 import hashlib
+import os
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Union
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def load_template(template_path: Path) -> dict:
+
+def _json_default(obj: object) -> object:
+    """Convert values orjson can't serialize natively (e.g. float/int subclasses such
+    as pydicom's DSfloat and IS) into plain Python types.
+    """
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_loads(data: bytes) -> object:
+    """Parse JSON data, using orjson if it is available.
+
+    Args:
+        data (bytes): The JSON data to parse.
+
+    Returns:
+        object: The parsed JSON object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def json_dumps(obj: object, indent: bool = True) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON, using orjson if it is available.
+
+    Args:
+        obj (object): The object to serialize.
+        indent (bool): Indent the output with two spaces. Default is True.
+
+    Returns:
+        bytes: The serialized JSON.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_json_default, option=option)
+
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+
+def write_json(path: Path, obj: object, current: Optional[bytes] = None) -> bool:
+    """Write an object to an indented JSON file, skipping the write if the file already
+    contains exactly that JSON.
+
+    Args:
+        path (Path): The path of the JSON file.
+        obj (object): The object to write.
+        current (bytes): The current contents of the file, if already read. Otherwise the
+            file is read to compare against.
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged.
+    """
+    data = json_dumps(obj, indent=True)
+
+    if current is None and path.exists():
+        current = path.read_bytes()
+
+    if data == current:
+        return False
+
+    path.write_bytes(data)
+    return True
+
+
+@functools.lru_cache(maxsize=16)
+def _load_template_cached(template_path: Path, mtime_ns: int) -> dict:
+    """Load a JSON template file. Cached on the path and its modification time, so that
+    the template is only parsed again if the file has changed.
+    """
+    return json_loads(template_path.read_bytes())
+
+
+def load_template(template_path: Union[Path, dict]) -> dict:
     """Load a JSON template file.
 
+    The loaded template is cached, so the dict returned is shared between calls and
+    should not be modified.
+
     Args:
-        template_path (Path): Path to the template file.
+        template_path (Path|dict): Path to the template file. If an already loaded template
+            dict is given it is returned as is.
 
     Returns:
         dict: The loaded template.
     """
-    with open(template_path, "r", encoding="utf-8") as file:
-        return json.load(file)
+    if isinstance(template_path, dict):
+        return template_path
 
+    template_path = Path(template_path).resolve()
+    return _load_template_cached(template_path, template_path.stat().st_mtime_ns)
 
-def download_file(url: str, expected_hash: str, output_path: Path):
+
+def download_file(url: str, expected_hash: str, output_path: Path, algorithm: str = "md5"):
     """Download a zip file from a URL and verify its hash.
 
     Args:
         url (str): The URL to download the file from.
         expected_hash (str): The expected hash of the file.
         output_path (Path): The path to save the downloaded file.
+        algorithm (str): The hashlib algorithm of the expected hash, e.g. "sha256". Default
+            is "md5".
     """
 
-    response = requests.get(url, timeout=10)
-    response.raise_for_status()
+    import requests  # pylint: disable=import-outside-toplevel
+
+    # Stream the download to disk in 1 MiB chunks, hashing as it is written, so that the
+    # file doesn't need to be held in memory or read back
+    file_hash = hashlib.new(algorithm)
 
-    with open(output_path, "wb") as file:
-        file.write(response.content)
+    with requests.get(url, stream=True, timeout=10) as response:
+        response.raise_for_status()
 
-    file_hash = hashlib.md5()
-    with open(output_path, "rb") as file:
-        while chunk := file.read(4096):
-            file_hash.update(chunk)
+        with open(output_path, "wb") as file:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                file_hash.update(chunk)
+                file.write(chunk)
 
     if file_hash.hexdigest() != expected_hash:
         raise ValueError("Hash mismatch")
 
+def _extract_members(zip_path: Path, members: List[zipfile.ZipInfo], output_path: Path):
+    """Extract members of a zip file, using a separate file handle from other threads.
+
+    Args:
+        zip_path (Path): The path of the zip file.
+        members (List[zipfile.ZipInfo]): The members to extract.
+        output_path (Path): The path to extract the members to.
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for member in members:
+            try:
+                zip_ref.extract(member, output_path)
+            except FileExistsError:
+                # Another thread created the directory of this member at the same time
+                zip_ref.extract(member, output_path)
+
+
+def extract_zip(zip_path: Path, output_path: Path, max_workers: Optional[int] = None):
+    """Extract a zip file, decompressing members in parallel threads (zlib releases the GIL
+    while inflating).
+
+    Args:
+        zip_path (Path): The path of the zip file.
+        output_path (Path): The path to extract the zip file to.
+        max_workers (int): The number of threads to extract with. If not provided, one per
+            CPU is used.
+    """
+
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        members = zip_ref.infolist()
+
+    # Deal the members out largest first, so each thread has a similar amount of work
+    members.sort(key=lambda member: member.compress_size, reverse=True)
+    workers = min(max_workers or os.cpu_count() or 1, max(len(members), 1))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_extract_members, zip_path, members[i::workers], output_path)
+            for i in range(workers)
+        ]
+        for future in futures:
+            future.result()
+
+
 def download_font_pack(output_path: Path):
     """Download a font pack required for PDF generation.
 
@@ -49,19 +191,19 @@ def download_font_pack(output_path: Path):
     """
 
     output_path.mkdir(exist_ok=True)
+    zip_path = output_path.joinpath("font_pack.zip")
 
     download_file(
         "https://github.com/reingart/pyfpdf/releases/download/binary/fpdf_unicode_font_pack.zip",
         "430c54cf9cd250f5809bcf76d06e41af",
-        output_path.joinpath("font_pack.zip")
+        zip_path
     )
 
     # Unzip file
-    with zipfile.ZipFile(output_path.joinpath("font_pack.zip"), "r") as zip_ref:
-        zip_ref.extractall(output_path)
+    extract_zip(zip_path, output_path)
 
     # Remove zip file
-    output_path.joinpath("font_pack.zip").unlink()
+    zip_path.unlink()
 
 def download_test_data(output_path: Path):
     """Download test data for the application.
@@ -71,16 +213,16 @@ def download_test_data(output_path: Path):
     """
 
     output_path.mkdir(exist_ok=True)
+    zip_path = output_path.joinpath("HNSCC.zip")
 
     download_file(
         "https://zenodo.org/record/5276878/files/HNSCC.zip",
         "6332d59406978a92f57d15da84f2e143",
-        output_path.joinpath("HNSCC.zip")
+        zip_path
     )
 
     # Unzip file
-    with zipfile.ZipFile(output_path.joinpath("HNSCC.zip"), "r") as zip_ref:
-        zip_ref.extractall(output_path)
+    extract_zip(zip_path, output_path)
 
     # Remove zip file
-    output_path.joinpath("HNSCC.zip").unlink()
+    zip_path.unlink()